@@ -1,8 +1,17 @@
 #!/usr/bin/env python3
 
-from aoc_utils import get_input_path, print_elapsed_time
+from aoc_utils import get_input_args, print_elapsed_time
+from argparse import ArgumentParser
+from collections import deque
+from multiprocessing import Pool
+from pathlib import Path
 from timeit import default_timer as timer
-from typing import List
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+CHUNK_SIZE: int = 64 * 1024 * 1024
+
+# Increases of a chunk as well as its first and last measurements (for stitching)
+ChunkResult = Tuple[Dict[int, int], List[int], List[int]]
 
 
 def count_increases(measurements: List[int]) -> int:
@@ -11,27 +20,130 @@ def count_increases(measurements: List[int]) -> int:
 
 
 def count_window_increases(measurements: List[int], window_size: int = 3) -> int:
-    window_sums: List[int] = []
-    for i in range(len(measurements) - window_size + 1):
-        window_sum = sum([measurements[j] for j in range(i, i + window_size)])
-        window_sums.append(window_sum)
-
+    # Two neighboring windows share all but one measurement, so comparing their sums
+    # boils down to comparing the measurement entering with the one leaving the window
     window_increases = [
-        cur > prev for prev, cur in zip(window_sums[:-1], window_sums[1:])
+        cur > prev for prev, cur in zip(measurements, measurements[window_size:])
     ]
 
     return sum(window_increases)
 
 
+def read_measurements(
+    path: Path, start: int = 0, end: Optional[int] = None
+) -> Iterator[int]:
+    # Yield every measurement whose line begins in the byte range `[start, end[`
+    with open(path, "rb") as file:
+        if start > 0:
+            # Skip the line which is cut by `start` (it belongs to the previous range)
+            file.seek(start - 1)
+            file.readline()
+
+        position = file.tell()
+        while end is None or position < end:
+            line = file.readline()
+            if not line:
+                break
+            position += len(line)
+            yield int(line)
+
+
+def count_window_increases_streaming(
+    measurements: Iterable[int], window_sizes: Sequence[int] = (1, 3)
+) -> Dict[int, int]:
+    assert len(window_sizes) > 0 and min(window_sizes) >= 1
+
+    # Ring buffer holding the most recent measurements (as many as the largest window)
+    buffer_size = max(window_sizes)
+    buffer = [0] * buffer_size
+    increases = {window_size: 0 for window_size in window_sizes}
+
+    for n, measurement in enumerate(measurements):
+        idx = n % buffer_size
+        for window_size in increases:
+            if n >= window_size and measurement > buffer[idx - window_size]:
+                increases[window_size] += 1
+        buffer[idx] = measurement
+
+    return increases
+
+
+def count_chunk_increases(
+    path: Path, start: int, end: int, window_sizes: Sequence[int]
+) -> ChunkResult:
+    buffer_size = max(window_sizes)
+    head: List[int] = []
+    tail: Deque[int] = deque(maxlen=buffer_size)
+
+    def record(measurements: Iterator[int]) -> Iterator[int]:
+        for measurement in measurements:
+            if len(head) < buffer_size:
+                head.append(measurement)
+            tail.append(measurement)
+            yield measurement
+
+    measurements = record(read_measurements(path, start, end))
+    increases = count_window_increases_streaming(measurements, window_sizes)
+    return (increases, head, [*tail])
+
+
+def count_window_increases_parallel(
+    path: Path,
+    window_sizes: Sequence[int] = (1, 3),
+    processes: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Dict[int, int]:
+    assert len(window_sizes) > 0 and min(window_sizes) >= 1 and chunk_size > 0
+    assert processes is None or processes >= 1
+
+    file_size = path.stat().st_size
+    chunks = [
+        (path, start, min(start + chunk_size, file_size), window_sizes)
+        for start in range(0, file_size, chunk_size)
+    ]
+
+    # Workers resolve `count_chunk_increases` by module name
+    with Pool(processes) as pool:
+        results = pool.starmap(count_chunk_increases, chunks)
+
+    # Each chunk only compared measurements within itself, so the comparisons across
+    # a boundary are still missing. These only involve the first measurements of a
+    # chunk and the last measurements before it, which are carried along.
+    buffer_size = max(window_sizes)
+    increases = {window_size: 0 for window_size in window_sizes}
+    carry: List[int] = []
+
+    for chunk_increases, head, tail in results:
+        for window_size in window_sizes:
+            increases[window_size] += chunk_increases[window_size]
+
+            for j, measurement in enumerate(head[:window_size]):
+                # Index of the measurement leaving the window, relative to the carry
+                k = len(carry) + j - window_size
+                if k >= 0 and measurement > carry[k]:
+                    increases[window_size] += 1
+
+        carry = (carry + tail)[-buffer_size:]
+
+    return increases
+
+
 if __name__ == "__main__":
-    data_path = get_input_path("Day 1: Sonar Sweep")
-    with open(data_path, "r") as file:
-        contents = file.readlines()
-        measurements = [int(line) for line in contents]
+    parser = ArgumentParser(description="Day 1: Sonar Sweep")
+    parser.add_argument(
+        "-p", "--processes", type=int, help="Count in parallel using worker processes"
+    )
+    args = get_input_args(parser)
+    data_path: Path = args.input_path
 
     start = timer()
-    num_increases = count_increases(measurements)
-    num_window_increases = count_window_increases(measurements)
+    if args.processes is not None:
+        increases = count_window_increases_parallel(data_path, (1, 3), args.processes)
+    else:
+        measurements = read_measurements(data_path)
+        increases = count_window_increases_streaming(measurements, (1, 3))
+    num_increases = increases[1]
+    num_window_increases = increases[3]
     stop = timer()
 
     print("Number of increasing measurements:", num_increases)
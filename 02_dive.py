@@ -1,14 +1,23 @@
 #!/usr/bin/env python3
 
 from aoc_utils import get_input_path, print_elapsed_time
+from array import array
+from pathlib import Path
 from timeit import default_timer as timer
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, Tuple
 
 CMD_FORWARD = "forward"
 CMD_DOWN = "down"
 CMD_UP = "up"
 VALID_COMMANDS = {CMD_FORWARD, CMD_DOWN, CMD_UP}
 
+OP_FORWARD = 0
+OP_DOWN = 1
+OP_UP = 2
+OPCODES = {CMD_FORWARD: OP_FORWARD, CMD_DOWN: OP_DOWN, CMD_UP: OP_UP}
+
+Location = Tuple[int, int]
+
 
 class ControlInput:
     def __init__(self, input: str):
@@ -20,6 +29,21 @@ class ControlInput:
         self.value = int(cmd_val[1])
 
 
+class CommandStore:
+    def __init__(self, lines: Iterable[str]) -> None:
+        # Columnar storage: One opcode byte and one value per command
+        self.opcodes = array("B")
+        self.values = array("q")
+
+        for line in lines:
+            command, value = line.split()
+            self.opcodes.append(OPCODES[command])
+            self.values.append(int(value))
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+
 def determine_location(inputs: List[ControlInput]) -> Tuple[int, int]:
     position = 0
     depth = 0
@@ -52,18 +76,88 @@ def determine_location_aim(inputs: List[ControlInput]) -> Tuple[int, int]:
     return (position, depth)
 
 
+def track_states(commands: CommandStore) -> Iterator[Tuple[int, int, int]]:
+    # Yield position, aim and depth after every command. The depth of the plain
+    # method is exactly the aim of the aim-method, so this covers both methods
+    aim = 0
+    position = 0
+    depth = 0
+
+    for opcode, value in zip(commands.opcodes, commands.values):
+        if opcode == OP_FORWARD:
+            position += value
+            depth += aim * value
+        elif opcode == OP_DOWN:
+            aim += value
+        else:
+            aim -= value
+
+        yield (position, aim, depth)
+
+
+def determine_locations(commands: CommandStore) -> Tuple[Location, Location]:
+    # A single pass is sufficient to determine both locations
+    position, aim, depth = 0, 0, 0
+    for position, aim, depth in track_states(commands):
+        pass
+
+    return ((position, aim), (position, depth))
+
+
+class LocationIndex:
+    def __init__(self, commands: CommandStore) -> None:
+        # Prefix lists: Entry `k` holds the state after the first `k` commands (plain
+        # ints, as the depth grows quadratically and may exceed 64 bits)
+        self.positions: List[int] = [0]
+        self.aims: List[int] = [0]
+        self.depths: List[int] = [0]
+
+        for position, aim, depth in track_states(commands):
+            self.positions.append(position)
+            self.aims.append(aim)
+            self.depths.append(depth)
+
+    def __len__(self) -> int:
+        # Number of commands (the index additionally holds the initial state)
+        return len(self.positions) - 1
+
+    def location(self, step: int) -> Location:
+        assert 0 <= step <= len(self)
+        return (self.positions[step], self.depths[step])
+
+    def plain_location(self, step: int) -> Location:
+        assert 0 <= step <= len(self)
+        return (self.positions[step], self.aims[step])
+
+    def displacement(self, first_step: int, last_step: int) -> Location:
+        assert 0 <= first_step <= last_step <= len(self)
+        return (
+            self.positions[last_step] - self.positions[first_step],
+            self.depths[last_step] - self.depths[first_step],
+        )
+
+    def locations(self, steps: Iterable[int]) -> List[Location]:
+        positions, depths = self.positions, self.depths
+        locations: List[Location] = []
+        for step in steps:
+            assert 0 <= step <= len(self)
+            locations.append((positions[step], depths[step]))
+        return locations
+
+
+def read_commands(path: Path) -> CommandStore:
+    with open(path, "r") as file:
+        return CommandStore(file)
+
+
 if __name__ == "__main__":
     data_path = get_input_path("Day 2: Dive!")
-    with open(data_path, "r") as file:
-        contents = file.readlines()
-        control_inputs = [ControlInput(line) for line in contents]
+    commands = read_commands(data_path)
 
     start = timer()
 
-    location1 = determine_location(control_inputs)
+    location1, location2 = determine_locations(commands)
     product1 = location1[0] * location1[1]
-
-    location2 = determine_location_aim(control_inputs)
     product2 = location2[0] * location2[1]
 
     stop = timer()
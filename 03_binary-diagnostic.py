@@ -1,8 +1,26 @@
 #!/usr/bin/env python3
 
 from aoc_utils import get_input_path, print_elapsed_time
+from array import array
+from bisect import bisect_left
 from timeit import default_timer as timer
-from typing import List, Tuple
+from typing import Iterable, List, Sequence, Tuple
+
+MAX_NUMBER_OF_BITS = 64
+
+
+class DiagnosticReport:
+    def __init__(self, binary_numbers: Iterable[str]) -> None:
+        self.numbers = array("Q")
+        self.number_of_bits = 0
+
+        for number in binary_numbers:
+            number = number.strip()
+            if self.number_of_bits == 0:
+                self.number_of_bits = len(number)
+                assert 0 < self.number_of_bits <= MAX_NUMBER_OF_BITS
+            assert len(number) == self.number_of_bits
+            self.numbers.append(int(number, 2))
 
 
 def calculate_most_common_bit(binary_numbers: List[str], pos: int) -> str:
@@ -44,6 +62,47 @@ def calculate_co2_scrubber_rating(binary_numbers: List[str]) -> int:
     return int(filtered_list[0], 2)
 
 
+def calculate_rating(
+    sorted_numbers: Sequence[int], number_of_bits: int, most_common: bool
+) -> int:
+    # All numbers in `[lo, hi[` share the bits already decided on (the `prefix`).
+    # Since the numbers are sorted, the ones with the current bit set form the upper
+    # part of that range, so the bit counts follow from a single bisection.
+    lo, hi = 0, len(sorted_numbers)
+    prefix = 0
+    pos = number_of_bits - 1
+
+    while hi - lo > 1 and pos >= 0:
+        bit = 1 << pos
+        split = bisect_left(sorted_numbers, prefix | bit, lo, hi)
+        zeros, ones = split - lo, hi - split
+
+        if most_common:
+            keep_ones = ones >= zeros
+        else:
+            keep_ones = ones < zeros
+
+        # Never filter out all remaining numbers
+        if (keep_ones and ones > 0) or zeros == 0:
+            lo = split
+            prefix |= bit
+        else:
+            hi = split
+
+        pos -= 1
+
+    return sorted_numbers[lo]
+
+
+def calculate_life_support_ratings(
+    numbers: Iterable[int], number_of_bits: int
+) -> Tuple[int, int]:
+    sorted_numbers = sorted(numbers)
+    oxygen_gen_rating = calculate_rating(sorted_numbers, number_of_bits, True)
+    co2_scrubber_rating = calculate_rating(sorted_numbers, number_of_bits, False)
+    return (oxygen_gen_rating, co2_scrubber_rating)
+
+
 def calculate_gamma_and_epsilon_rate(binary_numbers: List[str]) -> Tuple[int, int]:
     number_of_entries = len(binary_numbers)
     number_of_bits = len(binary_numbers[0])
@@ -61,18 +120,57 @@ def calculate_gamma_and_epsilon_rate(binary_numbers: List[str]) -> Tuple[int, in
     return (gamma_rate, epsilon_rate)
 
 
+def count_set_bits(numbers: Iterable[int], number_of_bits: int) -> List[int]:
+    # Bit-sliced counting: `counters[k]` holds bit `k` of the count of every column at
+    # once, so adding a number is a ripple-carry addition over all columns in parallel
+    # (on average less than two operations per number)
+    counters: List[int] = []
+    for number in numbers:
+        carry = number
+        for k in range(len(counters)):
+            if carry == 0:
+                break
+            counters[k], carry = counters[k] ^ carry, counters[k] & carry
+        if carry != 0:
+            counters.append(carry)
+
+    # Gather the counts per column, starting with the most significant bit
+    bits_count: List[int] = []
+    for pos in reversed(range(number_of_bits)):
+        count = 0
+        for k, counter in enumerate(counters):
+            count |= ((counter >> pos) & 1) << k
+        bits_count.append(count)
+
+    return bits_count
+
+
+def calculate_report_rates(report: DiagnosticReport) -> Tuple[int, int]:
+    number_of_entries = len(report.numbers)
+    number_of_bits = report.number_of_bits
+    bits_count = count_set_bits(report.numbers, number_of_bits)
+
+    gamma_rate = 0
+    for cnt in bits_count:
+        gamma_rate = (gamma_rate << 1) | (2 * cnt > number_of_entries)
+    epsilon_rate = gamma_rate ^ ((1 << number_of_bits) - 1)
+
+    return (gamma_rate, epsilon_rate)
+
+
 if __name__ == "__main__":
     data_path = get_input_path("Day 3: Binary Diagnostic")
     with open(data_path, "r") as file:
-        binary_numbers = file.read().splitlines()
+        report = DiagnosticReport(file)
 
     start = timer()
 
-    gamma, epsilon = calculate_gamma_and_epsilon_rate(binary_numbers)
+    gamma, epsilon = calculate_report_rates(report)
     power_consumption = gamma * epsilon
 
-    oxygen_gen_rating = calculate_oxygen_generator_rating(binary_numbers)
-    co2_scrubber_rating = calculate_co2_scrubber_rating(binary_numbers)
+    oxygen_gen_rating, co2_scrubber_rating = calculate_life_support_ratings(
+        report.numbers, report.number_of_bits
+    )
     life_support_rating = oxygen_gen_rating * co2_scrubber_rating
 
     stop = timer()
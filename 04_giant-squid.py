@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 
 from aoc_utils import get_input_path, print_elapsed_time
+from array import array
 from timeit import default_timer as timer
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
+
+# Board index, row and column of a number's occurrence
+Occurrence = Tuple[int, int, int]
 
 
 class BingoBoard:
@@ -57,6 +61,117 @@ def calculate_bingo_scores(numbers: List[int], boards: List[BingoBoard]) -> List
     return scores
 
 
+class BoardStack:
+    def __init__(self, numbers: List[int], boards: List[BingoBoard]) -> None:
+        assert len(boards) > 0
+        self.size = boards[0].size
+        assert all(board.size == self.size for board in boards)
+        self.numbers = numbers
+
+        # Turn at which each number is drawn first (numbers never drawn get the turn
+        # after the last one)
+        self.never_drawn = len(numbers)
+        draw_turns: Dict[int, int] = {}
+        for turn, number in enumerate(numbers):
+            draw_turns.setdefault(number, turn)
+
+        # All boards as one flat (boards x size x size) array of numbers and turns
+        self.cells = array("q", [0]) * (len(boards) * self.size * self.size)
+        self.turns = array("q", [0]) * len(self.cells)
+        for idx, board in enumerate(boards):
+            offset = idx * self.size * self.size
+            for number, (row, col) in board.entries.items():
+                cell = offset + row * self.size + col
+                self.cells[cell] = number
+                self.turns[cell] = draw_turns.get(number, self.never_drawn)
+
+        # A board wins at the earliest turn that completes any of its rows or columns
+        self.winning_turns: List[int] = []
+        size = self.size
+        for offset in range(0, len(self.turns), size * size):
+            board_turns = self.turns[offset : offset + size * size]
+            rows = [board_turns[r * size : (r + 1) * size] for r in range(size)]
+            cols = [board_turns[c::size] for c in range(size)]
+            self.winning_turns.append(min(max(line) for line in rows + cols))
+
+    def winners(self) -> List[int]:
+        # Board indices in order of winning (ties are resolved by board index)
+        winners = [
+            idx
+            for idx, turn in enumerate(self.winning_turns)
+            if turn < self.never_drawn
+        ]
+        winners.sort(key=lambda idx: self.winning_turns[idx])
+        return winners
+
+    def score(self, idx: int) -> int:
+        turn = self.winning_turns[idx]
+        assert turn < self.never_drawn
+
+        area = self.size * self.size
+        offset = idx * area
+        unmarked_sum = sum(
+            number
+            for number, number_turn in zip(
+                self.cells[offset : offset + area], self.turns[offset : offset + area]
+            )
+            if number_turn > turn
+        )
+        return unmarked_sum * self.numbers[turn]
+
+    def scores(self) -> List[int]:
+        return [self.score(idx) for idx in self.winners()]
+
+
+class BingoEngine:
+    def __init__(self, boards: List[BingoBoard]) -> None:
+        # Map every number to the boards (and cells) which contain it
+        self.index: Dict[int, List[Occurrence]] = {}
+        self.sizes: List[int] = []
+        self.unmarked_sums: List[int] = []
+        self.row_hits: List[List[int]] = []
+        self.col_hits: List[List[int]] = []
+        self.finished = bytearray(len(boards))
+        self.number_of_finished = 0
+
+        for idx, board in enumerate(boards):
+            for number, (row, col) in board.entries.items():
+                self.index.setdefault(number, []).append((idx, row, col))
+
+            self.sizes.append(board.size)
+            self.unmarked_sums.append(sum(board.entries.keys()))
+            self.row_hits.append([0] * board.size)
+            self.col_hits.append([0] * board.size)
+
+    def draw(self, number: int) -> List[Tuple[int, int]]:
+        winners: List[Tuple[int, int]] = []
+
+        # Drop the occurrences once drawn, so repeated draws have no effect
+        for idx, row, col in self.index.pop(number, []):
+            if self.finished[idx]:
+                continue
+
+            self.unmarked_sums[idx] -= number
+            self.row_hits[idx][row] += 1
+            self.col_hits[idx][col] += 1
+
+            size = self.sizes[idx]
+            if self.row_hits[idx][row] == size or self.col_hits[idx][col] == size:
+                self.finished[idx] = 1
+                self.number_of_finished += 1
+                winners.append((idx, self.unmarked_sums[idx] * number))
+
+        return winners
+
+    def draw_all(self, numbers: Iterable[int]) -> List[int]:
+        scores: List[int] = []
+        for number in numbers:
+            scores.extend(score for _, score in self.draw(number))
+            if self.number_of_finished == len(self.finished):
+                break
+        return scores
+
+
 if __name__ == "__main__":
     data_path = get_input_path("Day 4: Giant Squid")
     with open(data_path, "r") as file:
@@ -72,7 +187,7 @@ if __name__ == "__main__":
         board = [line.split() for line in lines if len(line) != 0]
         boards.append(BingoBoard(board))
 
-    scores = calculate_bingo_scores(drawn_numbers, boards)
+    scores = BingoEngine(boards).draw_all(drawn_numbers)
     assert len(scores) >= 2
 
     stop = timer()
@@ -1,8 +1,51 @@
 #!/usr/bin/env python3
 
 from aoc_utils import get_input_path, print_elapsed_time
+from bisect import bisect_left, bisect_right, insort
+from itertools import combinations
 from timeit import default_timer as timer
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Tuple
+
+# Start and end coordinates of a line (x1, y1, x2, y2)
+Segment = Tuple[int, int, int, int]
+Coordinate = Tuple[int, int]
+
+# Closed interval of a line parameter and lines grouped by (orientation, key)
+Interval = Tuple[int, int]
+LineGroups = Dict[Tuple[int, int], List[Interval]]
+
+# Largest grid which is rasterised, sparser maps are handled analytically
+MAX_GRID_CELLS = 1 << 26
+
+# Orientations of lines. Each line is identified by a key which is constant along the
+# line (row, column, x - y or x + y) and parametrised by the x (or y) coordinate.
+HORIZONTAL = 0
+VERTICAL = 1
+DIAGONAL = 2
+ANTI_DIAGONAL = 3
+
+LINE_KEY: List[Callable[[int, int], int]] = [
+    lambda x, y: y,
+    lambda x, y: x,
+    lambda x, y: x - y,
+    lambda x, y: x + y,
+]
+LINE_PARAMETER: List[Callable[[int, int], int]] = [
+    lambda x, y: x,
+    lambda x, y: y,
+    lambda x, y: x,
+    lambda x, y: x,
+]
+LINE_POINT: List[Callable[[int, int], Coordinate]] = [
+    lambda key, t: (t, key),
+    lambda key, t: (key, t),
+    lambda key, t: (t, t - key),
+    lambda key, t: (t, key - t),
+]
+
+# Translation table incrementing every cell count, saturating at 2 (only overlaps
+# matter, so all counts >= 2 are equivalent)
+INCREMENT = bytes([min(count + 1, 2) for count in range(256)])
 
 
 class Point:
@@ -78,6 +121,208 @@ def generate_vent_map(lines: List[Line]) -> Dict[Point, int]:
     return vent_map
 
 
+def is_diagonal(segment: Segment) -> bool:
+    x1, y1, x2, y2 = segment
+    return x1 != x2 and y1 != y2
+
+
+def extract_segments(input: Iterable[str]) -> List[Segment]:
+    segments: List[Segment] = []
+
+    for raw_line in input:
+        raw_start, raw_end = raw_line.split(" -> ")
+        x1, y1 = map(int, raw_start.split(","))
+        x2, y2 = map(int, raw_end.split(","))
+        assert x1 == x2 or y1 == y2 or abs(x1 - x2) == abs(y1 - y2)
+        segments.append((x1, y1, x2, y2))
+
+    return segments
+
+
+class VentGrid:
+    def __init__(self, width: int, height: int, origin: Coordinate = (0, 0)) -> None:
+        self.width = width
+        self.height = height
+        self.origin = origin
+        self.cells = bytearray(width * height)
+
+    def draw(self, segment: Segment) -> None:
+        # Shift the segment, so that the origin of the grid becomes (0, 0)
+        x0, y0 = self.origin
+        x1, y1, x2, y2 = segment
+        x1, y1, x2, y2 = x1 - x0, y1 - y0, x2 - x0, y2 - y0
+        start = y1 * self.width + x1
+        end = y2 * self.width + x2
+        if start > end:
+            start, end = end, start
+
+        # Every segment is a strided slice of the flat grid, which is updated at once
+        length = max(abs(x2 - x1), abs(y2 - y1))
+        step = (end - start) // length if length > 0 else 1
+        cells = slice(start, end + 1, step)
+        self.cells[cells] = self.cells[cells].translate(INCREMENT)
+
+    def overlaps(self) -> int:
+        return self.cells.count(2)
+
+
+def get_grid_bounds(segments: List[Segment]) -> Tuple[int, int, Coordinate]:
+    # Width, height and origin of the smallest grid containing all `segments`
+    if not segments:
+        return (0, 0, (0, 0))
+    min_x = min(min(s[0], s[2]) for s in segments)
+    min_y = min(min(s[1], s[3]) for s in segments)
+    width = max(max(s[0], s[2]) for s in segments) - min_x + 1
+    height = max(max(s[1], s[3]) for s in segments) - min_y + 1
+    return (width, height, (min_x, min_y))
+
+
+def count_overlaps(segments: List[Segment]) -> Tuple[int, int]:
+    grid = VentGrid(*get_grid_bounds(segments))
+
+    # Draw the horizontal/vertical layer first, then add the diagonal one on top
+    diagonals: List[Segment] = []
+    for segment in segments:
+        if is_diagonal(segment):
+            diagonals.append(segment)
+        else:
+            grid.draw(segment)
+    num_overlaps_hv = grid.overlaps()
+
+    for segment in diagonals:
+        grid.draw(segment)
+    num_overlaps_diag = grid.overlaps()
+
+    return (num_overlaps_hv, num_overlaps_diag)
+
+
+def get_orientation(segment: Segment) -> int:
+    x1, y1, x2, y2 = segment
+    if y1 == y2:
+        return HORIZONTAL
+    elif x1 == x2:
+        return VERTICAL
+    return DIAGONAL if (x2 - x1) == (y2 - y1) else ANTI_DIAGONAL
+
+
+def merge_intervals(intervals: List[Interval]) -> Tuple[List[Interval], List[Interval]]:
+    # Determine the union and the parts covered at least twice of the `intervals`
+    events: List[Tuple[int, int]] = []
+    for lo, hi in intervals:
+        events.append((lo, 1))
+        events.append((hi + 1, -1))
+    events.sort()
+
+    union: List[Interval] = []
+    overlaps: List[Interval] = []
+    coverage = 0
+    union_start = overlap_start = 0
+
+    for t, change in events:
+        previous, coverage = coverage, coverage + change
+        if previous == 0 and coverage > 0:
+            union_start = t
+        elif previous > 0 and coverage == 0:
+            union.append((union_start, t - 1))
+        if previous < 2 <= coverage:
+            overlap_start = t
+        elif coverage < 2 <= previous:
+            overlaps.append((overlap_start, t - 1))
+
+    return (union, overlaps)
+
+
+def contains(intervals: List[Interval], t: int) -> bool:
+    # Last of the sorted, disjoint intervals starting at or before `t`
+    idx = bisect_left(intervals, (t + 1,)) - 1
+    return idx >= 0 and t <= intervals[idx][1]
+
+
+def find_crossings(
+    groups: LineGroups, orientation1: int, orientation2: int
+) -> Iterator[Coordinate]:
+    # Lines of `orientation1` are swept along the key of `orientation2` (and vice
+    # versa), so one set of lines is "horizontal", the other one "vertical"
+    key1, key2 = LINE_KEY[orientation1], LINE_KEY[orientation2]
+    point1, point2 = LINE_POINT[orientation1], LINE_POINT[orientation2]
+
+    ADD, QUERY, REMOVE = 0, 1, 2
+    events: List[Tuple[int, int, int, int]] = []
+
+    for (orientation, key), intervals in groups.items():
+        for lo, hi in intervals:
+            if orientation == orientation1:
+                u1, u2 = key2(*point1(key, lo)), key2(*point1(key, hi))
+                events.append((min(u1, u2), ADD, key, 0))
+                events.append((max(u1, u2), REMOVE, key, 0))
+            elif orientation == orientation2:
+                v1, v2 = key1(*point2(key, lo)), key1(*point2(key, hi))
+                events.append((key, QUERY, min(v1, v2), max(v1, v2)))
+    events.sort()
+
+    active: List[int] = []
+    for u, kind, v, v_max in events:
+        if kind == ADD:
+            insort(active, v)
+        elif kind == REMOVE:
+            del active[bisect_left(active, v)]
+        else:
+            for idx in range(bisect_left(active, v), bisect_right(active, v_max)):
+                # The key of `orientation2` changes by `slope` per step along the line
+                # of `orientation1`, so the crossing might not be on a grid point
+                key = active[idx]
+                offset = key2(*point1(key, 0))
+                slope = key2(*point1(key, 1)) - offset
+                t, remainder = divmod(u - offset, slope)
+                if remainder == 0:
+                    yield point1(key, t)
+
+
+def count_overlaps_sweep(segments: List[Segment]) -> Tuple[int, int]:
+    lines: Dict[Tuple[int, int], List[Interval]] = {}
+    for segment in segments:
+        x1, y1, x2, y2 = segment
+        orientation = get_orientation(segment)
+        key = LINE_KEY[orientation](x1, y1)
+        t1 = LINE_PARAMETER[orientation](x1, y1)
+        t2 = LINE_PARAMETER[orientation](x2, y2)
+        lines.setdefault((orientation, key), []).append((min(t1, t2), max(t1, t2)))
+
+    # Within a line, overlaps follow from merging the intervals
+    unions: LineGroups = {}
+    overlaps: LineGroups = {}
+    for line, intervals in lines.items():
+        unions[line], overlaps[line] = merge_intervals(intervals)
+
+    result: List[int] = []
+    for orientations in [(HORIZONTAL, VERTICAL), tuple(range(4))]:
+        number_of_overlaps = sum(
+            hi - lo + 1
+            for (orientation, _), intervals in overlaps.items()
+            if orientation in orientations
+            for lo, hi in intervals
+        )
+
+        # Lines of different orientations cross in at most one point. Each crossing is
+        # an overlap, unless it has already been counted above (once per line).
+        crossings: Set[Coordinate] = set()
+        for orientation1, orientation2 in combinations(orientations, 2):
+            crossings.update(find_crossings(unions, orientation1, orientation2))
+
+        for x, y in crossings:
+            counted = 0
+            for orientation in orientations:
+                line = (orientation, LINE_KEY[orientation](x, y))
+                if line in overlaps:
+                    t = LINE_PARAMETER[orientation](x, y)
+                    counted += contains(overlaps[line], t)
+            number_of_overlaps += 1 - counted
+
+        result.append(number_of_overlaps)
+
+    return (result[0], result[1])
+
+
 if __name__ == "__main__":
     data_path = get_input_path("Day 5: Hydrothermal Venture")
     with open(data_path, "r") as file:
@@ -85,13 +330,13 @@ if __name__ == "__main__":
 
     start = timer()
 
-    lines = extract_lines(raw_lines, include_diagonals=False)
-    vent_map = generate_vent_map(lines)
-    num_overlaps_hv = sum([vents >= 2 for vents in vent_map.values()])
+    segments = extract_segments(raw_lines)
+    width, height, _ = get_grid_bounds(segments)
 
-    lines = extract_lines(raw_lines, include_diagonals=True)
-    vent_map = generate_vent_map(lines)
-    num_overlaps_diag = sum([vents >= 2 for vents in vent_map.values()])
+    if width * height <= MAX_GRID_CELLS:
+        num_overlaps_hv, num_overlaps_diag = count_overlaps(segments)
+    else:
+        num_overlaps_hv, num_overlaps_diag = count_overlaps_sweep(segments)
 
     stop = timer()
 
@@ -2,17 +2,22 @@
 
 from aoc_utils import get_input_path, print_elapsed_time
 from timeit import default_timer as timer
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional
 
 REPRODUCTION_TIME: int = 6
 INITIAL_REPRODUCTION_TIME: int = 8
 
+Matrix = List[List[int]]
 
-def set_up_population(initial_population: List[int]) -> Dict[int, int]:
+
+def set_up_population(
+    initial_population: List[int],
+    initial_reproduction_time: int = INITIAL_REPRODUCTION_TIME,
+) -> Dict[int, int]:
     # Model population as a dictionary mapping reproduction time to number of fish
     population = {
         time: initial_population.count(time)
-        for time in range(INITIAL_REPRODUCTION_TIME + 1)
+        for time in range(initial_reproduction_time + 1)
     }
     return population
 
@@ -34,6 +39,118 @@ def simulate(population: Dict[int, int], days: int) -> None:
         update_population(population)
 
 
+def build_transition_matrix(
+    reproduction_time: int = REPRODUCTION_TIME,
+    initial_reproduction_time: int = INITIAL_REPRODUCTION_TIME,
+) -> Matrix:
+    # One day as a linear map: entry [i][j] is the number of fish with time `i` the
+    # next day originating from a single fish with time `j`
+    assert 0 <= reproduction_time < initial_reproduction_time
+    size = initial_reproduction_time + 1
+    matrix = [[0] * size for _ in range(size)]
+
+    for time in range(1, size):
+        matrix[time - 1][time] = 1
+    matrix[reproduction_time][0] += 1
+    matrix[initial_reproduction_time][0] += 1
+
+    return matrix
+
+
+def multiply(a: Matrix, b: Matrix, modulus: Optional[int] = None) -> Matrix:
+    b_columns = [*zip(*b)]
+    product = [[sum(x * y for x, y in zip(row, col)) for col in b_columns] for row in a]
+    if modulus is not None:
+        product = [[entry % modulus for entry in row] for row in product]
+    return product
+
+
+def matrix_power(
+    matrix: Matrix, exponent: int, modulus: Optional[int] = None
+) -> Matrix:
+    assert exponent >= 0
+    size = len(matrix)
+    result = [[int(i == j) for j in range(size)] for i in range(size)]
+
+    # Exponentiation by squaring
+    while exponent > 0:
+        if exponent & 1:
+            result = multiply(result, matrix, modulus)
+        matrix = multiply(matrix, matrix, modulus)
+        exponent >>= 1
+
+    return result
+
+
+def simulate_fast(
+    population: Dict[int, int],
+    days: int,
+    modulus: Optional[int] = None,
+    reproduction_time: int = REPRODUCTION_TIME,
+    initial_reproduction_time: int = INITIAL_REPRODUCTION_TIME,
+) -> Dict[int, int]:
+    matrix = build_transition_matrix(reproduction_time, initial_reproduction_time)
+    matrix = matrix_power(matrix, days, modulus)
+
+    times = range(initial_reproduction_time + 1)
+    counts = [population.get(time, 0) for time in times]
+    result = {time: sum(x * y for x, y in zip(matrix[time], counts)) for time in times}
+    if modulus is not None:
+        result = {time: count % modulus for time, count in result.items()}
+
+    return result
+
+
+def count_timers(
+    initial_population: Iterable[int],
+    initial_reproduction_time: int = INITIAL_REPRODUCTION_TIME,
+) -> List[int]:
+    # Histogram of the timers in a single pass
+    counts = [0] * (initial_reproduction_time + 1)
+    for time in initial_population:
+        assert 0 <= time <= initial_reproduction_time
+        counts[time] += 1
+    return counts
+
+
+def project_populations(
+    initial_populations: Iterable[Iterable[int]],
+    days: List[int],
+    modulus: Optional[int] = None,
+    reproduction_time: int = REPRODUCTION_TIME,
+    initial_reproduction_time: int = INITIAL_REPRODUCTION_TIME,
+) -> List[List[int]]:
+    # The simulation is linear, so the size of any population is the weighted sum of
+    # the offspring of a single fish per timer. Only this vector of offspring counts
+    # is advanced (jumping from one requested day to the next), it is shared by all
+    # populations.
+    matrix = build_transition_matrix(reproduction_time, initial_reproduction_time)
+    size = initial_reproduction_time + 1
+
+    offspring_per_day: Dict[int, List[int]] = {}
+    offspring = [[1] * size]
+    current_day = 0
+    for day in sorted(set(days)):
+        assert day >= 0
+        offspring = multiply(
+            offspring, matrix_power(matrix, day - current_day, modulus), modulus
+        )
+        offspring_per_day[day] = offspring[0]
+        current_day = day
+
+    projections: List[List[int]] = []
+    for initial_population in initial_populations:
+        counts = count_timers(initial_population, initial_reproduction_time)
+        projection = [
+            sum(x * y for x, y in zip(counts, offspring_per_day[day])) for day in days
+        ]
+        if modulus is not None:
+            projection = [count % modulus for count in projection]
+        projections.append(projection)
+
+    return projections
+
+
 if __name__ == "__main__":
     data_path = get_input_path("Day 6: Lanternfish")
     with open(data_path, "r") as file:
@@ -41,11 +158,9 @@ if __name__ == "__main__":
 
     start = timer()
 
-    result: Dict[int, int] = {}
-    for days in {80, 256}:
-        population = set_up_population(initial_population)
-        simulate(population, days)
-        result[days] = sum(population.values())
+    days = [80, 256]
+    projection = project_populations([initial_population], days)[0]
+    result = dict(zip(days, projection))
 
     stop = timer()
 
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 
 from aoc_utils import get_input_path, print_elapsed_time
+from bisect import bisect_right
+from collections import Counter
+from itertools import accumulate
 from timeit import default_timer as timer
 from typing import Callable, List, Optional, Tuple
 
@@ -15,7 +18,7 @@ def cost_part1(x: Position, y: Position) -> Fuel:
 def cost_part2(x: Position, y: Position) -> Fuel:
     diff = abs(x - y)
     # Gauss summation (sum of numbers from 1 to diff)
-    return Fuel(diff * (diff + 1) / 2)
+    return Fuel(diff * (diff + 1) // 2)
 
 
 def find_optimal_position(
@@ -35,14 +38,166 @@ def find_optimal_position(
     return (best_position, best_cost)
 
 
+class SortedFleet:
+    def __init__(self, positions: List[Position]) -> None:
+        assert len(positions) > 0
+        self.positions = sorted(positions)
+        self.prefix_sums = [0, *accumulate(self.positions)]
+        self.square_sum = sum(p * p for p in self.positions)
+
+    def linear_cost(self, location: Position) -> Fuel:
+        # Crabs left of `location` move right and vice versa
+        n = len(self.positions)
+        idx = bisect_right(self.positions, location)
+        left = location * idx - self.prefix_sums[idx]
+        right = (self.prefix_sums[n] - self.prefix_sums[idx]) - location * (n - idx)
+        return left + right
+
+    def triangular_cost(self, location: Position) -> Fuel:
+        # Sum of d * (d + 1) / 2, i.e. half of the squared plus the linear distances
+        n = len(self.positions)
+        squares = n * location * location
+        squares += self.square_sum - 2 * location * self.prefix_sums[n]
+        return (squares + self.linear_cost(location)) // 2
+
+
+def find_optimal_position_linear(positions: List[Position]) -> Tuple[Position, Fuel]:
+    # The (lower) median minimizes the sum of absolute distances
+    fleet = SortedFleet(positions)
+    median = fleet.positions[(len(positions) - 1) // 2]
+    return (median, fleet.linear_cost(median))
+
+
+def find_optimal_position_triangular(
+    positions: List[Position],
+) -> Tuple[Position, Fuel]:
+    # The continuous optimum is at most 1/2 away from the mean, so the best integer
+    # position is among the few positions around it
+    fleet = SortedFleet(positions)
+    mean_floor = fleet.prefix_sums[-1] // len(positions)
+    candidates = range(
+        max(mean_floor - 1, fleet.positions[0]),
+        min(mean_floor + 2, fleet.positions[-1]) + 1,
+    )
+    costs = [(fleet.triangular_cost(location), location) for location in candidates]
+    best_cost, best_position = min(costs)
+    return (best_position, best_cost)
+
+
+def find_optimal_position_convex(
+    positions: List[Position], cost_func: Callable[[Position, Position], Fuel]
+) -> Tuple[Position, Fuel]:
+    # Bucket crabs sharing a position, then search for the first position from which
+    # the (convex) total cost does not decrease anymore
+    buckets = Counter(positions)
+
+    def total_cost(location: Position) -> Fuel:
+        return sum(count * cost_func(p, location) for p, count in buckets.items())
+
+    lo, hi = min(buckets), max(buckets)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if total_cost(mid) <= total_cost(mid + 1):
+            hi = mid
+        else:
+            lo = mid + 1
+
+    return (lo, total_cost(lo))
+
+
+class CrabFleet:
+    def __init__(self, size: int) -> None:
+        # Fenwick trees over the positions `[0, size[` holding counts and sums of crabs
+        self.size = size
+        self.counts = [0] * (size + 1)
+        self.sums = [0] * (size + 1)
+        self.number_of_crabs = 0
+        self.total_sum = 0
+        self.square_sum = 0
+
+        # Highest power of two not exceeding the size (for descending the tree)
+        self.top_bit = 1 << (size.bit_length() - 1) if size > 0 else 0
+
+    def _update(self, position: Position, count: int) -> None:
+        assert 0 <= position < self.size
+        self.number_of_crabs += count
+        self.total_sum += count * position
+        self.square_sum += count * position * position
+
+        i = position + 1
+        while i <= self.size:
+            self.counts[i] += count
+            self.sums[i] += count * position
+            i += i & -i
+
+    def _prefix(self, position: Position) -> Tuple[int, int]:
+        # Number and sum of all crabs at or left of `position`
+        count = 0
+        total = 0
+        i = min(position + 1, self.size)
+        while i > 0:
+            count += self.counts[i]
+            total += self.sums[i]
+            i -= i & -i
+        return (count, total)
+
+    def _select(self, k: int) -> Position:
+        # Position of the `k`-th crab from the left (starting at 1)
+        assert 1 <= k <= self.number_of_crabs
+        i = 0
+        bit = self.top_bit
+        while bit > 0:
+            if i + bit <= self.size and self.counts[i + bit] < k:
+                i += bit
+                k -= self.counts[i]
+            bit >>= 1
+        return i
+
+    def add(self, position: Position) -> None:
+        self._update(position, 1)
+
+    def remove(self, position: Position) -> None:
+        count = self._prefix(position)[0] - self._prefix(position - 1)[0]
+        assert count > 0
+        self._update(position, -1)
+
+    def linear_cost(self, location: Position) -> Fuel:
+        count, total = self._prefix(location)
+        left = location * count - total
+        right = (self.total_sum - total) - location * (self.number_of_crabs - count)
+        return left + right
+
+    def triangular_cost(self, location: Position) -> Fuel:
+        n = self.number_of_crabs
+        squares = n * location * location
+        squares += self.square_sum - 2 * location * self.total_sum
+        return (squares + self.linear_cost(location)) // 2
+
+    def optimum(self, cost: str = "linear") -> Tuple[Position, Fuel]:
+        assert self.number_of_crabs > 0
+        if cost == "linear":
+            median = self._select((self.number_of_crabs + 1) // 2)
+            return (median, self.linear_cost(median))
+
+        assert cost == "triangular"
+        mean_floor = self.total_sum // self.number_of_crabs
+        candidates = range(
+            max(mean_floor - 1, self._select(1)),
+            min(mean_floor + 2, self._select(self.number_of_crabs)) + 1,
+        )
+        costs = [(self.triangular_cost(location), location) for location in candidates]
+        best_cost, best_position = min(costs)
+        return (best_position, best_cost)
+
+
 if __name__ == "__main__":
     data_path = get_input_path("Day 7: The Treachery of Whales")
     with open(data_path, "r") as file:
         crab_positions = [*map(Position, file.read().split(","))]
 
     start = timer()
-    position1, fuel1 = find_optimal_position(crab_positions, cost_part1)
-    position2, fuel2 = find_optimal_position(crab_positions, cost_part2)
+    position1, fuel1 = find_optimal_position_linear(crab_positions)
+    position2, fuel2 = find_optimal_position_triangular(crab_positions)
     stop = timer()
 
     print(f"Position and fuel consumption (1st part): {position1}, {fuel1}")
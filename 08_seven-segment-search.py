@@ -1,12 +1,32 @@
 #!/usr/bin/env python3
 
 from aoc_utils import get_input_path, print_elapsed_time
+from functools import lru_cache
+from itertools import permutations
 from timeit import default_timer as timer
 from typing import Callable, Dict, List
 
 # Mapping signal patterns (sorted) to digits
 PatternMap = Dict[str, int]
 
+# Mapping the set of signal patterns (as bitset of masks) to a digit per pattern mask
+WiringTable = Dict[int, bytes]
+
+SEGMENTS = "abcdefg"
+NO_DIGIT = 0xFF
+DIGIT_SEGMENTS = [
+    "abcefg",
+    "cf",
+    "acdeg",
+    "acdfg",
+    "bcdf",
+    "abdfg",
+    "abdefg",
+    "acf",
+    "abcdefg",
+    "abcdfg",
+]
+
 
 class NoteEntry:
     def __init__(self, raw_entry: str) -> None:
@@ -85,6 +105,50 @@ def build_pattern_map(patterns: List[str]) -> PatternMap:
     return {pattern: i for i, pattern in enumerate(pattern_results)}
 
 
+@lru_cache(maxsize=None)
+def pattern_mask(pattern: str) -> int:
+    """Encode the signals of `pattern` as a 7-bit mask"""
+    mask = 0
+    for signal in pattern:
+        mask |= 1 << SEGMENTS.index(signal)
+    return mask
+
+
+def patterns_signature(patterns: List[str]) -> int:
+    """Encode the set of `patterns` as a bitset of their masks"""
+    signature = 0
+    for pattern in patterns:
+        signature |= 1 << pattern_mask(pattern)
+    return signature
+
+
+@lru_cache(maxsize=None)
+def build_wiring_table() -> WiringTable:
+    """Build the table of digits per pattern mask for every possible wiring"""
+    table: WiringTable = {}
+    for wiring in permutations(SEGMENTS):
+        wired = {segment: wire for segment, wire in zip(SEGMENTS, wiring)}
+        patterns = ["".join(wired[s] for s in segments) for segments in DIGIT_SEGMENTS]
+
+        digit_map = bytearray([NO_DIGIT]) * (1 << len(SEGMENTS))
+        for digit, pattern in enumerate(patterns):
+            digit_map[pattern_mask(pattern)] = digit
+        table[patterns_signature(patterns)] = bytes(digit_map)
+
+    return table
+
+
+def decode_output_value(note: NoteEntry) -> int:
+    """Decode the output value of the `note` by looking up its wiring"""
+    digit_map = build_wiring_table()[patterns_signature(note.signal_patterns)]
+    value = 0
+    for pattern in note.output_value:
+        digit = digit_map[pattern_mask(pattern)]
+        assert digit != NO_DIGIT
+        value = 10 * value + digit
+    return value
+
+
 if __name__ == "__main__":
     data_path = get_input_path("Day 8: Seven Segment Search")
     with open(data_path, "r") as file:
@@ -100,9 +164,7 @@ if __name__ == "__main__":
     # Part 2: Decode the patterns and use them to calculate the sum of output values
     sum = 0
     for note in notes:
-        pattern_map = build_pattern_map(note.signal_patterns)
-        digits = [pattern_map[sorted_str(pattern)] for pattern in note.output_value]
-        sum += int("".join(map(str, digits)))
+        sum += decode_output_value(note)
 
     stop = timer()
 
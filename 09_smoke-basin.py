@@ -1,13 +1,27 @@
 #!/usr/bin/env python3
 
-from aoc_utils import get_input_path, print_elapsed_time
+from aoc_utils import get_input_args, print_elapsed_time
+from argparse import ArgumentParser
+from array import array
+from collections import Counter
+from heapq import heappush, heapreplace, nlargest
 from math import prod
+from pathlib import Path
 from timeit import default_timer as timer
-from typing import List, Set, Tuple
+from typing import Dict, Iterable, Iterator, List, Set, Tuple, Union
 
 Position = Tuple[int, int]
 MapSize = Tuple[int, int]
 
+# Run of basin cells within a row (first column, last column and basin label)
+Run = Tuple[int, int, int]
+
+# Row of heights, either read on its own or sliced from a flat heightmap
+Row = Union[bytes, bytearray]
+
+MAX_HEIGHT = 9
+DIGITS = bytes.maketrans(b"0123456789", bytes(range(10)))
+
 
 def outside_of_map(coordinate: Position, row_size: int, col_size: int) -> bool:
     """Check if the given `coordinate` is outside of the map"""
@@ -86,23 +100,242 @@ def find_largest_basins(
     return basins[:n]
 
 
+class FlatHeightmap:
+    def __init__(self, lines: Iterable[str]) -> None:
+        """Store the heightmap given by `lines` as flat array (row by row)"""
+        self.heights = bytearray()
+        self.rows = 0
+        for line in lines:
+            row = bytes(int(c) for c in line.strip())
+            if self.rows == 0:
+                self.cols = len(row)
+            assert len(row) == self.cols
+            self.heights += row
+            self.rows += 1
+        assert self.rows >= 1
+
+
+def find_row_low_points(current: Row, above: Row, below: Row) -> List[int]:
+    """Find the columns of all low points in the `current` row"""
+    border = bytes([MAX_HEIGHT + 1])
+    left = border + current[:-1]
+    right = current[1:] + border
+
+    neighbors = zip(current, above, below, left, right)
+    return [
+        col
+        for col, (h, a, b, l, r) in enumerate(neighbors)
+        if h < a and h < b and h < l and h < r
+    ]
+
+
+def find_low_points_flat(heightmap: FlatHeightmap) -> List[int]:
+    """Find all low points (as flat indices), row by row"""
+    cols = heightmap.cols
+    heights = heightmap.heights
+    border = bytes([MAX_HEIGHT + 1]) * cols
+
+    low_points: List[int] = []
+    for row in range(heightmap.rows):
+        offset = row * cols
+        current = heights[offset : offset + cols]
+        above = heights[offset - cols : offset] if row > 0 else border
+        below = heights[offset + cols : offset + 2 * cols] or border
+        row_low_points = find_row_low_points(current, above, below)
+        low_points.extend(offset + col for col in row_low_points)
+
+    return low_points
+
+
+def find_root(parents: "array[int]", i: int) -> int:
+    """Find the root of `i` in the union-find forest (with path halving)"""
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+
+def find_basin_sizes(heightmap: FlatHeightmap) -> List[int]:
+    """Label all basins in one raster scan and return their sizes"""
+    cols = heightmap.cols
+    heights = heightmap.heights
+    # 32-bit labels (4 bytes per cell) suffice for maps of up to 2^31 cells
+    assert len(heights) < (1 << 31)
+    parents = array("i", range(len(heights)))
+
+    for i, height in enumerate(heights):
+        if height == MAX_HEIGHT:
+            continue
+
+        # Merge with the basins of the left and upper neighbor
+        root = find_root(parents, i)
+        if i % cols > 0 and heights[i - 1] != MAX_HEIGHT:
+            left_root = find_root(parents, i - 1)
+            parents[left_root] = root
+        if i >= cols and heights[i - cols] != MAX_HEIGHT:
+            upper_root = find_root(parents, i - cols)
+            if upper_root != root:
+                parents[upper_root] = root
+
+    basin_sizes = Counter(
+        find_root(parents, i)
+        for i, height in enumerate(heights)
+        if height != MAX_HEIGHT
+    )
+    return [*basin_sizes.values()]
+
+
+def read_rows(path: Path) -> Iterator[bytes]:
+    """Read the heightmap row by row (as heights, not as characters)"""
+    with open(path, "rb") as file:
+        for line in file:
+            row = line.strip()
+            if row:
+                yield row.translate(DIGITS)
+
+
+def find_row_runs(row: bytes) -> List[Tuple[int, int]]:
+    """Find the runs of basin cells (all but the highest ones) in the `row`"""
+    runs: List[Tuple[int, int]] = []
+    col = 0
+    while col < len(row):
+        end = row.find(MAX_HEIGHT, col)
+        if end == -1:
+            end = len(row)
+        if end > col:
+            runs.append((col, end - 1))
+        col = end + 1
+    return runs
+
+
+def merge_basin_row(
+    previous_runs: List[Run], sizes: Dict[int, int], row: bytes, next_label: int
+) -> Tuple[List[Run], Dict[int, int], List[int]]:
+    """Merge the basin runs of a new `row` into the basins of the previous one
+
+    Only the basins touching the previous row are tracked, so memory is bounded by the
+    width of the map. Basins which do not continue into the new `row` are complete.
+
+    Args:
+        previous_runs (List[Run]): Runs of the previous row, labelled by basin
+        sizes (Dict[int, int]): Sizes of the basins of the previous row (so far)
+        row (bytes): Heights of the new row
+        next_label (int): First unused basin label
+
+    Returns:
+        Tuple[List[Run], Dict[int, int], List[int]]: Runs and basin sizes of the new
+            row as well as the sizes of the completed basins
+    """
+    parents: Dict[int, int] = {label: label for label in sizes}
+
+    def find(label: int) -> int:
+        while parents[label] != label:
+            parents[label] = parents[parents[label]]
+            label = parents[label]
+        return label
+
+    # Label the new runs and union them with all overlapping runs of the previous row
+    runs: List[Run] = []
+    run_sizes: Dict[int, int] = {}
+    idx = 0
+    for label, (first, last) in enumerate(find_row_runs(row), next_label):
+        parents[label] = label
+        run_sizes[label] = last - first + 1
+
+        while idx < len(previous_runs) and previous_runs[idx][1] < first:
+            idx += 1
+        overlap = idx
+        while overlap < len(previous_runs) and previous_runs[overlap][0] <= last:
+            root = find(previous_runs[overlap][2])
+            if root != find(label):
+                parents[root] = find(label)
+            overlap += 1
+
+        runs.append((first, last, label))
+
+    # Accumulate the sizes per basin, then separate the completed basins
+    merged_sizes: Dict[int, int] = {}
+    for label, size in [*sizes.items(), *run_sizes.items()]:
+        root = find(label)
+        merged_sizes[root] = merged_sizes.get(root, 0) + size
+
+    runs = [(first, last, find(label)) for first, last, label in runs]
+    open_basins = {label for _, _, label in runs}
+    completed = [size for root, size in merged_sizes.items() if root not in open_basins]
+    sizes = {root: merged_sizes[root] for root in open_basins}
+
+    return (runs, sizes, completed)
+
+
+def stream_heightmap(rows: Iterable[bytes], n: int) -> Tuple[int, List[int]]:
+    """Process the heightmap row by row, return risk levels and `n` largest basins"""
+    sum_of_risk_levels = 0
+    largest_basins: List[int] = []
+
+    def add_basins(basin_sizes: Iterable[int]) -> None:
+        for size in basin_sizes:
+            if len(largest_basins) < n:
+                heappush(largest_basins, size)
+            elif size > largest_basins[0]:
+                heapreplace(largest_basins, size)
+
+    # Rolling window of three rows: a row is evaluated once the next one arrives
+    above = current = b""
+    runs: List[Run] = []
+    sizes: Dict[int, int] = {}
+    next_label = 0
+
+    for row in rows:
+        if current:
+            assert len(row) == len(current)
+            low_points = find_row_low_points(current, above, row)
+            sum_of_risk_levels += sum(1 + current[col] for col in low_points)
+            above = current
+        else:
+            above = bytes([MAX_HEIGHT + 1]) * len(row)
+        current = row
+
+        runs, sizes, completed = merge_basin_row(runs, sizes, row, next_label)
+        next_label += len(row)
+        add_basins(completed)
+
+    if current:
+        below = bytes([MAX_HEIGHT + 1]) * len(current)
+        low_points = find_row_low_points(current, above, below)
+        sum_of_risk_levels += sum(1 + current[col] for col in low_points)
+    add_basins(sizes.values())
+
+    return (sum_of_risk_levels, sorted(largest_basins, reverse=True))
+
+
 if __name__ == "__main__":
-    data_path = get_input_path("Day 9: Smoke Basin")
-    with open(data_path, "r") as file:
-        heightmap = [[int(c) for c in line] for line in file.read().splitlines()]
+    parser = ArgumentParser(description="Day 9: Smoke Basin")
+    parser.add_argument(
+        "-s", "--stream", action="store_true", help="Process the map row by row"
+    )
+    args = get_input_args(parser)
+    data_path: Path = args.input_path
+
+    if args.stream:
+        start = timer()
+
+        sum_of_risk_levels, largest_basins = stream_heightmap(read_rows(data_path), 3)
+        product_of_largest_basins = prod(largest_basins)
 
-    start = timer()
+        stop = timer()
+    else:
+        with open(data_path, "r") as file:
+            heightmap = FlatHeightmap(file)
 
-    assert len(heightmap) >= 1
-    map_size = (len(heightmap), len(heightmap[0]))
+        start = timer()
 
-    points = find_low_points(heightmap, map_size)
-    sum_of_risk_levels = sum([(1 + heightmap[r][c]) for r, c in points])
+        points = find_low_points_flat(heightmap)
+        sum_of_risk_levels = sum([(1 + heightmap.heights[i]) for i in points])
 
-    basins = find_largest_basins(heightmap, points, map_size, 3)
-    product_of_largest_basins = prod([len(basin) for basin in basins])
+        basin_sizes = find_basin_sizes(heightmap)
+        product_of_largest_basins = prod(nlargest(3, basin_sizes))
 
-    stop = timer()
+        stop = timer()
 
     print("Sum of risk levels of low points:", sum_of_risk_levels)
     print("Product of three largest basins:", product_of_largest_basins)
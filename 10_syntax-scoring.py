@@ -1,13 +1,26 @@
 #!/usr/bin/env python3
 
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from aoc_utils import get_input_path, print_elapsed_time
+from bisect import bisect_left, bisect_right, insort
+from random import choice
 from timeit import default_timer as timer
 
 SYNTAX_SCORE: Dict[str, int] = {")": 3, "]": 57, "}": 1197, ">": 25137}
 COMPLETION_SCORE: Dict[str, int] = {")": 1, "]": 2, "}": 3, ">": 4}
 ASSOCIATED_BRACKET: Dict[str, str] = {"(": ")", "[": "]", "{": "}", "<": ">"}
 
+# Opening bracket expected by each closing bracket
+MATCHING_BRACKET: Dict[str, str] = {v: k for k, v in ASSOCIATED_BRACKET.items()}
+
+# Immutable bracket stack sharing its tail with previous versions (so storing a
+# checkpoint is free): (top bracket, rest of the stack, depth, rolling hash)
+Stack = Tuple[str, Any, int, int]
+EMPTY_STACK: Stack = ("", None, 0, 0)
+HASH_MODULUS = (1 << 61) - 1
+
+CHECKPOINT_INTERVAL = 64
+
 
 def is_opening_bracket(bracket: str) -> bool:
     return bracket in ASSOCIATED_BRACKET
@@ -75,13 +88,203 @@ def calculate_scores(chunks: List[str]) -> Tuple[int, int]:
     return (syntax_error_score, middle_score)
 
 
+def score_chunk(chunk: str) -> Tuple[int, Optional[int]]:
+    """Return syntax error and completion score (`None` if corrupted) of `chunk`"""
+    stack: List[str] = []
+    for bracket in chunk:
+        if bracket in ASSOCIATED_BRACKET:
+            stack.append(bracket)
+        else:
+            # Closing brackets without an opening one are illegal as well
+            if not stack or stack.pop() != MATCHING_BRACKET[bracket]:
+                return (SYNTAX_SCORE[bracket], None)
+
+    # The completion sequence is given by the remaining brackets (in reverse)
+    total_score = 0
+    for bracket in reversed(stack):
+        total_score = (5 * total_score) + COMPLETION_SCORE[ASSOCIATED_BRACKET[bracket]]
+    return (0, total_score)
+
+
+def select(values: List[int], k: int) -> int:
+    """Return the `k`-th smallest of the `values` (starting at 0) via quickselect"""
+    assert 0 <= k < len(values)
+    while True:
+        pivot = choice(values)
+        smaller = [v for v in values if v < pivot]
+        if k < len(smaller):
+            values = smaller
+            continue
+
+        number_of_equal = values.count(pivot)
+        if k < len(smaller) + number_of_equal:
+            return pivot
+
+        k -= len(smaller) + number_of_equal
+        values = [v for v in values if v > pivot]
+
+
+def calculate_scores_streaming(chunks: Iterable[str]) -> Tuple[int, int]:
+    """Calculate syntax error and middle completion score in one pass per chunk"""
+    syntax_error_score: int = 0
+    autocomplete_scores: List[int] = []
+
+    for chunk in chunks:
+        error_score, completion_score = score_chunk(chunk.rstrip("\n"))
+        syntax_error_score += error_score
+        if completion_score is not None:
+            autocomplete_scores.append(completion_score)
+
+    middle_score = select(autocomplete_scores, len(autocomplete_scores) // 2)
+    return (syntax_error_score, middle_score)
+
+
+def push(stack: Stack, bracket: str) -> Stack:
+    """Push an opening `bracket` onto the `stack`"""
+    _, _, depth, hash = stack
+    hash = (hash * 131 + ord(bracket)) % HASH_MODULUS
+    return (bracket, stack, depth + 1, hash)
+
+
+def same_stack(a: Stack, b: Stack) -> bool:
+    """Compare two stacks, stopping at the first shared part"""
+    if a[2] != b[2] or a[3] != b[3]:
+        return False
+
+    while a is not b:
+        if a[0] != b[0]:
+            return False
+        a, b = a[1], b[1]
+    return True
+
+
+def completion_score(stack: Stack) -> int:
+    """Calculate the completion score of the remaining brackets on the `stack`"""
+    total_score = 0
+    while stack is not EMPTY_STACK:
+        bracket, stack, _, _ = stack
+        total_score = (5 * total_score) + COMPLETION_SCORE[ASSOCIATED_BRACKET[bracket]]
+    return total_score
+
+
+class IncrementalLine:
+    def __init__(self, text: str, interval: int = CHECKPOINT_INTERVAL) -> None:
+        """Syntax check of a single line which is kept up to date on edits"""
+        assert interval > 0
+        self.text = text
+        self.interval = interval
+
+        # Bracket stacks before the characters at the respective positions (only up to
+        # the first illegal character)
+        self.positions: List[int] = [0]
+        self.stacks: List[Stack] = [EMPTY_STACK]
+
+        self.error_score = 0
+        self.completion_score: Optional[int] = None
+        self._scan(0, [], [])
+
+    def _scan(
+        self, checkpoint: int, old_positions: List[int], old_stacks: List[Stack]
+    ) -> None:
+        """Scan from the given `checkpoint`, stop early when meeting an old one"""
+        position = self.positions[checkpoint]
+        stack = self.stacks[checkpoint]
+        del self.positions[checkpoint + 1 :]
+        del self.stacks[checkpoint + 1 :]
+
+        old = 0
+        while position < len(self.text):
+            while old < len(old_positions) and old_positions[old] < position:
+                old += 1
+            if old < len(old_positions) and old_positions[old] == position:
+                old_stack = old_stacks[old]
+                if same_stack(stack, old_stack):
+                    # Same state at the same (unchanged) suffix: The rest of the line
+                    # and therefore the previous scores are still valid
+                    if position > self.positions[-1]:
+                        self.positions.append(position)
+                        self.stacks.append(old_stack)
+                    self.positions.extend(old_positions[old + 1 :])
+                    self.stacks.extend(old_stacks[old + 1 :])
+                    return
+
+            if position - self.positions[-1] >= self.interval:
+                self.positions.append(position)
+                self.stacks.append(stack)
+
+            bracket = self.text[position]
+            if bracket in ASSOCIATED_BRACKET:
+                stack = push(stack, bracket)
+            else:
+                # Closing brackets without an opening one are illegal as well
+                if stack[0] != MATCHING_BRACKET[bracket]:
+                    self.error_score = SYNTAX_SCORE[bracket]
+                    self.completion_score = None
+                    return
+                stack = stack[1]
+            position += 1
+
+        self.error_score = 0
+        self.completion_score = completion_score(stack)
+
+    def edit(self, start: int, end: int, replacement: str) -> None:
+        """Replace the characters in `[start, end[` by the given `replacement`"""
+        assert 0 <= start <= end <= len(self.text)
+        self.text = self.text[:start] + replacement + self.text[end:]
+
+        # Old checkpoints behind the edited range are still valid (if shifted)
+        delta = len(replacement) - (end - start)
+        split = bisect_left(self.positions, end)
+        old_positions = [position + delta for position in self.positions[split:]]
+        old_stacks = self.stacks[split:]
+
+        # Rescan from the last checkpoint in front of the edit
+        checkpoint = bisect_right(self.positions, start) - 1
+        self._scan(checkpoint, old_positions, old_stacks)
+
+
+class NavigationFile:
+    def __init__(
+        self, chunks: Iterable[str], interval: int = CHECKPOINT_INTERVAL
+    ) -> None:
+        """All lines of a navigation file, with scores kept up to date on edits"""
+        self.lines = [IncrementalLine(chunk.rstrip("\n"), interval) for chunk in chunks]
+        self.syntax_error_score = sum(line.error_score for line in self.lines)
+        self.completion_scores = sorted(
+            line.completion_score
+            for line in self.lines
+            if line.completion_score is not None
+        )
+
+    def edit(self, line_number: int, start: int, end: int, replacement: str) -> None:
+        """Replace the characters in `[start, end[` of a line by `replacement`"""
+        line = self.lines[line_number]
+
+        # Remove the old scores of the line, then add the new ones
+        self.syntax_error_score -= line.error_score
+        if line.completion_score is not None:
+            idx = bisect_left(self.completion_scores, line.completion_score)
+            del self.completion_scores[idx]
+
+        line.edit(start, end, replacement)
+
+        self.syntax_error_score += line.error_score
+        if line.completion_score is not None:
+            insort(self.completion_scores, line.completion_score)
+
+    def scores(self) -> Tuple[int, int]:
+        """Return syntax error and middle completion score of the whole file"""
+        assert len(self.completion_scores) > 0
+        middle_score = self.completion_scores[len(self.completion_scores) // 2]
+        return (self.syntax_error_score, middle_score)
+
+
 if __name__ == "__main__":
     data_path = get_input_path("Day 10: Syntax Scoring")
-    with open(data_path, "r") as file:
-        chunks = file.read().splitlines()
 
     start = timer()
-    syntax_error_score, middle_score = calculate_scores(chunks)
+    with open(data_path, "r") as file:
+        syntax_error_score, middle_score = calculate_scores_streaming(file)
     stop = timer()
 
     print("Total syntax error score:", syntax_error_score)
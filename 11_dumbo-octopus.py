@@ -2,94 +2,195 @@
 
 from aoc_utils import get_input_path, print_elapsed_time
 from timeit import default_timer as timer
-from typing import Iterator, List, Optional, Tuple
-
-MATRIX_SIZE = 10
-Position = Tuple[int, int]
-
-
-def inside_matrix(coordinate: Position) -> bool:
-    """Check if the given `coordinate` is inside the states matrix"""
-    r, c = coordinate
-    return (r >= 0) and (r < MATRIX_SIZE) and (c >= 0) and (c < MATRIX_SIZE)
-
-
-def adjacent_coordinates(coordinate: Position) -> Iterator[Position]:
-    """Return coordinates of adjacent points of the given `coordinate`"""
-    r, c = coordinate
-    adjacent_coordinates = [
-        (r - 1, c - 1),
-        (r - 1, c),
-        (r - 1, c + 1),
-        (r, c - 1),
-        (r, c + 1),
-        (r + 1, c - 1),
-        (r + 1, c),
-        (r + 1, c + 1),
-    ]
-    return filter(inside_matrix, adjacent_coordinates)
-
-
-def traverse_matrix(size: int) -> Iterator[Position]:
-    """Helper function for traversing the nested list"""
-    for r in range(size):
-        for c in range(size):
-            yield (r, c)
-
-
-def take_step(energy_levels: List[List[int]]) -> int:
-    """Update the energy levels and return the total number of flashes"""
-
-    # First part: Increment energy levels, store flash positions
-    flashes: List[Position] = []
-    for coordinate in traverse_matrix(MATRIX_SIZE):
-        r, c = coordinate
-        energy_levels[r][c] += 1
-        if energy_levels[r][c] == 10:
-            flashes.append(coordinate)
-
-    # Second part: Continuously update positions affected by flashes
-    while len(flashes) > 0:
-        flash_position = flashes.pop(0)
-        for coordinate in adjacent_coordinates(flash_position):
-            r, c = coordinate
-            energy_levels[r][c] += 1
-            if energy_levels[r][c] == 10:
-                flashes.append(coordinate)
-
-    # Finally: Count the number of flashes and reset the respective positions
-    number_of_flashes = 0
-    for coordinate in traverse_matrix(MATRIX_SIZE):
-        r, c = coordinate
-        if energy_levels[r][c] >= 10:
+from typing import Dict, List, Optional, Tuple
+
+FLASH_LEVEL = 10
+
+# Translation tables for incrementing all energy levels and resetting flashed ones
+INCREMENT = bytes([min(level + 1, 255) for level in range(256)])
+RESET = bytes([0 if level >= FLASH_LEVEL else level for level in range(256)])
+
+HASH_MASK = (1 << 64) - 1
+
+# Returned by `run_until_sync` if the states repeat without ever synchronizing
+NEVER_SYNCHRONIZES = -1
+
+
+class OctopusGrid:
+    def __init__(self, energy_levels: List[List[int]]) -> None:
+        """Store the energy levels as flat array, surrounded by a border of padding"""
+        assert len(energy_levels) > 0
+        self.rows = len(energy_levels)
+        self.cols = len(energy_levels[0])
+        self.size = self.rows * self.cols
+
+        # Thanks to the border, neighbors are always at the same offsets
+        width = self.cols + 2
+        self.width = width
+        self.offsets = [
+            -width - 1,
+            -width,
+            -width + 1,
+            -1,
+            1,
+            width - 1,
+            width,
+            width + 1,
+        ]
+
+        self.levels = bytearray(width * (self.rows + 2))
+        self.flashed: List[int] = []
+        for r, row in enumerate(energy_levels):
+            assert len(row) == self.cols
+            offset = (r + 1) * width + 1
+            self.levels[offset : offset + self.cols] = bytes(row)
+
+    def _clear_border(self) -> None:
+        width = self.width
+        self.levels[:width] = bytes(width)
+        self.levels[-width:] = bytes(width)
+        self.levels[::width] = bytes(self.rows + 2)
+        self.levels[width - 1 :: width] = bytes(self.rows + 2)
+
+    def step(self) -> int:
+        """Update the energy levels and return the total number of flashes"""
+        # First part: Increment all energy levels at once, find flash positions
+        levels = self.levels.translate(INCREMENT)
+
+        flashes: List[int] = []
+        idx = levels.find(FLASH_LEVEL)
+        while idx != -1:
+            flashes.append(idx)
+            idx = levels.find(FLASH_LEVEL, idx + 1)
+
+        # Second part: Propagate the flashes to their neighbors
+        number_of_flashes = 0
+        offsets = self.offsets
+        self.flashed = []
+        while flashes:
+            idx = flashes.pop()
+            self.flashed.append(idx)
             number_of_flashes += 1
-            energy_levels[r][c] = 0
-
-    return number_of_flashes
+            for offset in offsets:
+                neighbor = idx + offset
+                levels[neighbor] += 1
+                if levels[neighbor] == FLASH_LEVEL:
+                    flashes.append(neighbor)
+
+        # Finally: Reset the flashed positions (and the border, which was incremented)
+        self.levels = levels.translate(RESET)
+        self._clear_border()
+        return number_of_flashes
+
+
+def zobrist_key(idx: int, phase: int) -> int:
+    """Pseudo-random key of a cell in a given phase (SplitMix64)"""
+    z = (idx * FLASH_LEVEL + phase + 0x9E3779B97F4A7C15) & HASH_MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & HASH_MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & HASH_MASK
+    return z ^ (z >> 31)
+
+
+class OctopusSimulation:
+    def __init__(self, grid: OctopusGrid) -> None:
+        """Simulate the `grid` step by step, detecting when its states repeat
+
+        The grid state is hashed by XOR-ing a key per cell, which depends on the phase
+        `(level - step) % 10` of the cell. Cells which are only incremented keep their
+        phase, so after each step only flashed cells and their neighbors are rehashed.
+        Equal hashes at steps congruent modulo 10 are taken as equal states.
+        """
+        self.grid = grid
+        self.step = 0
+        self.total_flashes = [0]
+        self.sync_step: Optional[int] = None
+
+        # Set once the states repeat: first step of the cycle and its length
+        self.cycle_start: Optional[int] = None
+        self.period: Optional[int] = None
+
+        width = grid.width
+        self.hash = 0
+        for r in range(1, grid.rows + 1):
+            for idx in range(r * width + 1, r * width + grid.cols + 1):
+                self.hash ^= zobrist_key(idx, grid.levels[idx])
+        self.seen: Dict[Tuple[int, int], int] = {(self.hash, 0): 0}
+
+    def _is_inside(self, idx: int) -> bool:
+        r, c = divmod(idx, self.grid.width)
+        return 1 <= r <= self.grid.rows and 1 <= c <= self.grid.cols
+
+    def advance(self) -> None:
+        """Take a single step and update the hash as well as the cycle detection"""
+        old_levels = self.grid.levels
+        number_of_flashes = self.grid.step()
+        new_levels = self.grid.levels
+
+        touched = set(self.grid.flashed)
+        for idx in self.grid.flashed:
+            touched.update(idx + offset for offset in self.grid.offsets)
+
+        for idx in touched:
+            old_phase = (old_levels[idx] - self.step) % FLASH_LEVEL
+            new_phase = (new_levels[idx] - self.step - 1) % FLASH_LEVEL
+            if old_phase != new_phase and self._is_inside(idx):
+                self.hash ^= zobrist_key(idx, old_phase) ^ zobrist_key(idx, new_phase)
+
+        self.step += 1
+        self.total_flashes.append(self.total_flashes[-1] + number_of_flashes)
+        if number_of_flashes == self.grid.size and self.sync_step is None:
+            self.sync_step = self.step
+
+        state = (self.hash, self.step % FLASH_LEVEL)
+        if self.cycle_start is None and state in self.seen:
+            self.cycle_start = self.seen[state]
+            self.period = self.step - self.cycle_start
+        self.seen[state] = self.step
+
+    def run_until_sync(self, max_steps: Optional[int] = None) -> Optional[int]:
+        """Return the first step during which all octopuses flash
+
+        Returns `NEVER_SYNCHRONIZES` if the states repeat before all octopuses flash
+        at once, and `None` if `max_steps` is reached before either can be decided.
+        """
+        while self.sync_step is None and self.cycle_start is None:
+            if max_steps is not None and self.step >= max_steps:
+                return None
+            self.advance()
+        if self.sync_step is None:
+            return NEVER_SYNCHRONIZES
+        return self.sync_step
+
+    def flashes_after(self, steps: int) -> int:
+        """Return the total number of flashes after the given number of `steps`"""
+        while self.step < steps and self.cycle_start is None:
+            self.advance()
+
+        if steps <= self.step:
+            return self.total_flashes[steps]
+
+        # Jump ahead through the cycle
+        assert self.cycle_start is not None and self.period is not None
+        start, period = self.cycle_start, self.period
+        flashes_per_cycle = (
+            self.total_flashes[start + period] - self.total_flashes[start]
+        )
+        cycles, remainder = divmod(steps - start, period)
+        return self.total_flashes[start + remainder] + cycles * flashes_per_cycle
 
 
 if __name__ == "__main__":
     data_path = get_input_path("Day 11: Dumbo Octopus")
     with open(data_path, "r") as file:
         energy_levels = [[*map(int, line)] for line in file.read().splitlines()]
+    grid = OctopusGrid(energy_levels)
 
     start = timer()
 
-    steps = 0
     required_steps = 100
-
-    result_part1 = 0
-    result_part2: Optional[int] = None
-
-    while result_part2 == None:
-        number_of_flashes = take_step(energy_levels)
-        steps += 1
-
-        if steps <= required_steps:
-            result_part1 += number_of_flashes
-
-        if number_of_flashes == MATRIX_SIZE * MATRIX_SIZE:
-            result_part2 = steps
+    simulation = OctopusSimulation(grid)
+    result_part1 = simulation.flashes_after(required_steps)
+    result_part2 = simulation.run_until_sync()
 
     stop = timer()
 
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 
 from aoc_utils import get_input_path, print_elapsed_time
+from functools import lru_cache
 from timeit import default_timer as timer
-from typing import Dict, Iterator, List, Optional, Set
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 START = "start"
 END = "end"
@@ -11,6 +12,14 @@ Cave = str
 CaveMap = Dict[Cave, Set[Cave]]
 Path = List[Cave]
 
+# Small caves (by id) reachable from a small cave, with the number of ways to get there
+WeightedEdges = List[Dict[int, int]]
+
+# How to undo entering a cave when backtracking
+ENTERED_SMALL = 0
+ENTERED_TWICE = 1
+ENTERED_BIG = 2
+
 
 def is_small_cave(name: str) -> bool:
     """Return `True` if the cave is a small one"""
@@ -94,6 +103,143 @@ def generate_cave_map(raw_lines: List[str]) -> CaveMap:
     return map
 
 
+def contract_cave_map(map: CaveMap) -> Tuple[List[Cave], WeightedEdges]:
+    """Contract the big caves of the `map` into weighted edges between small caves
+
+    Every way from one small cave to the next, either directly or through big caves, is
+    counted as one edge. A single transit visits each big cave at most once, so big
+    caves connected to each other are supported as well.
+
+    Args:
+        map (CaveMap): The map of the cave, associating caves to their neighbors
+
+    Returns:
+        Tuple[List[Cave], WeightedEdges]: The small caves (their index is used as id)
+            and the weighted edges between them
+    """
+    small_caves = sorted(filter(is_small_cave, map))
+    ids = {cave: idx for idx, cave in enumerate(small_caves)}
+
+    def transit(cave: Cave, visited: Set[Cave], weights: Dict[int, int]) -> None:
+        for neighbor in map[cave]:
+            if is_small_cave(neighbor):
+                weights[ids[neighbor]] = weights.get(ids[neighbor], 0) + 1
+            elif neighbor not in visited:
+                visited.add(neighbor)
+                transit(neighbor, visited, weights)
+                visited.remove(neighbor)
+
+    edges: WeightedEdges = []
+    for cave in small_caves:
+        weights: Dict[int, int] = {}
+        transit(cave, set(), weights)
+        edges.append(weights)
+
+    return (small_caves, edges)
+
+
+def count_paths(map: CaveMap) -> Tuple[int, int]:
+    """Count the paths without and with double access, without enumerating them"""
+    small_caves, edges = contract_cave_map(map)
+    start, end = small_caves.index(START), small_caves.index(END)
+
+    # Visited small caves are tracked as bitmask, which makes the state hashable. Both
+    # parts share the cache, as part 1 equals part 2 after the double access is used.
+    @lru_cache(maxsize=None)
+    def count(cave: int, visited: int, visited_twice: bool) -> int:
+        if cave == end:
+            return 1
+
+        paths = 0
+        for neighbor, weight in edges[cave].items():
+            if neighbor == start:
+                continue
+            bit = 1 << neighbor
+            if not visited & bit:
+                paths += weight * count(neighbor, visited | bit, visited_twice)
+            elif not visited_twice:
+                paths += weight * count(neighbor, visited, True)
+        return paths
+
+    visited = 1 << start
+    return (count(start, visited, True), count(start, visited, False))
+
+
+def generate_paths(map: CaveMap, double_access: bool = False) -> Iterator[Path]:
+    """Lazily generate every path of the `map` exactly once
+
+    Paths are generated depth-first, visiting neighbors in alphabetical order. Only the
+    current path is held in memory: The same list is yielded every time and modified
+    afterwards, so it has to be copied if it is supposed to be kept. As for
+    `count_paths`, big caves are visited at most once between two small caves.
+
+    Args:
+        map (CaveMap): The map of the cave, associating caves to their neighbors
+        double_access (bool, optional): Allow a single small cave to be visited twice.
+            Defaults to False.
+
+    Yields:
+        Iterator[Path]: The current path whenever it reaches the end
+    """
+    neighbors = {cave: sorted(caves) for cave, caves in map.items()}
+    small = {cave: is_small_cave(cave) for cave in map}
+
+    path: Path = [START]
+    visited: Set[Cave] = {START}
+    visited_twice = not double_access
+
+    # Big caves visited since the last small cave (one set per small cave on the path)
+    transits: List[Set[Cave]] = [set()]
+
+    # Cave, index of the next neighbor to explore and how to undo entering the cave
+    frames: List[List] = [[START, 0, None]]
+
+    while frames:
+        frame = frames[-1]
+        cave, idx, _ = frame
+
+        if cave != END and idx < len(neighbors[cave]):
+            frame[1] += 1
+            neighbor = neighbors[cave][idx]
+            if neighbor == START:
+                continue
+
+            if small[neighbor]:
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    undo = ENTERED_SMALL
+                elif not visited_twice:
+                    visited_twice = True
+                    undo = ENTERED_TWICE
+                else:
+                    continue
+                transits.append(set())
+            else:
+                if neighbor in transits[-1]:
+                    continue
+                transits[-1].add(neighbor)
+                undo = ENTERED_BIG
+
+            path.append(neighbor)
+            frames.append([neighbor, 0, undo])
+            continue
+
+        if cave == END:
+            yield path
+
+        # Backtrack
+        _, _, undo = frames.pop()
+        path.pop()
+        if undo == ENTERED_SMALL:
+            visited.remove(cave)
+            transits.pop()
+        elif undo == ENTERED_TWICE:
+            visited_twice = False
+            transits.pop()
+        elif undo == ENTERED_BIG:
+            transits[-1].remove(cave)
+
+
 if __name__ == "__main__":
     data_path = get_input_path("Day 12: Passage Pathing")
     with open(data_path, "r") as file:
@@ -101,23 +247,7 @@ if __name__ == "__main__":
         map = generate_cave_map(lines)
 
     start = timer()
-
-    visited: Set[str] = set()
-    current_path: Path = [START]
-    successful_paths: List[Path] = []
-
-    explore(map, visited, current_path, successful_paths)
-    paths_without_double_access = len(successful_paths)
-
-    successful_paths.clear()
-    for cave in get_small_caves(map):
-        visited.clear()
-        current_path = [START]
-        explore(map, visited, current_path, successful_paths, double_visit_cave=cave)
-
-    # It is necessary to remove some duplicated paths
-    paths_with_double_access = len(set(tuple(path) for path in successful_paths))
-
+    paths_without_double_access, paths_with_double_access = count_paths(map)
     stop = timer()
 
     print("Paths without double access:", paths_without_double_access)
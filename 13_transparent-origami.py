@@ -31,6 +31,44 @@ def get_dimensions(paper: DotSet) -> Tuple[int, int]:
     return (width, height)
 
 
+class FoldPlan:
+    def __init__(self, instructions: List[Instruction], size: Tuple[int, int]) -> None:
+        """Compile the `instructions` into one coordinate mapping table per axis
+
+        Both axes fold independently, so the tables are composed from the last fold
+        backwards. Each fold roughly halves the range of coordinates, so compiling costs
+        O(width + height) instead of rehashing all dots for every fold.
+        """
+        self.tables: List[List[int]] = []
+        for index, axis in enumerate(["x", "y"]):
+            lines = [line for a, line in instructions if a == axis]
+
+            # Range of possible coordinates before each fold and after the last one
+            ranges = [(0, size[index] - 1)]
+            for line in lines:
+                lo, hi = ranges[-1]
+                if hi > line:
+                    lo = min(lo, 2 * line - hi)
+                ranges.append((lo, min(hi, line)))
+
+            lo, hi = ranges[-1]
+            table = list(range(lo, hi + 1))
+            for i in reversed(range(len(lines))):
+                line = lines[i]
+                lo, hi = ranges[i]
+                offset = ranges[i + 1][0]
+                table = [
+                    table[(c if c <= line else 2 * line - c) - offset]
+                    for c in range(lo, hi + 1)
+                ]
+            self.tables.append(table)
+
+    def apply(self, paper: DotSet) -> DotSet:
+        """Map all dots of the `paper` at once and return the folded one"""
+        x_table, y_table = self.tables
+        return {(x_table[x], y_table[y]) for x, y in paper}
+
+
 def main():
     data_path = get_input_path("Day 13: Transparent Origami")
     with open(data_path, "r") as file:
@@ -48,13 +86,10 @@ def main():
 
     start = timer()
 
-    # Fold the paper once for the first part
-    paper = fold(paper, instructions[0])
-    dots_after_first_fold = len(paper)
-
-    # Now apply the rest of the instructions
-    for instruction in instructions[1:]:
-        paper = fold(paper, instruction)
+    # Compile plans for the first fold and for all of them, then fold the paper
+    size = get_dimensions(paper)
+    dots_after_first_fold = len(FoldPlan(instructions[:1], size).apply(paper))
+    paper = FoldPlan(instructions, size).apply(paper)
 
     stop = timer()
 
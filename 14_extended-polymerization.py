@@ -3,53 +3,107 @@
 from aoc_utils import get_input_path, print_elapsed_time
 from collections import defaultdict
 from timeit import default_timer as timer
-from typing import DefaultDict, Dict, Tuple
-
-
-def polymerize(template: str, rules: Dict[str, str]) -> str:
-    """Polymerize a new polymer according to the given `template` and `rules`"""
-    new_polymer: str = ""
-    for i in range(len(template) - 1):
-        pair = template[i : i + 2]
-        insertion = rules[pair]
-        new_polymer += pair[0] + insertion
-
-    # The last character is missing at this point, so add it
-    new_polymer += template[-1]
-    return new_polymer
-
-
-def count_pairs_and_characters(
-    template: str,
-) -> Tuple[DefaultDict[str, int], DefaultDict[str, int]]:
-    """Count the pairs and single characters in the given `template`"""
-    pair_count: DefaultDict[str, int] = defaultdict(int)
-    for i in range(len(template) - 1):
-        pair = template[i : i + 2]
-        pair_count[pair] += 1
-
-    char_count: DefaultDict[str, int] = defaultdict(
-        int, {c: template.count(c) for c in set(template)}
-    )
-
-    return (pair_count, char_count)
-
-
-def polymerize_virtually(
-    pair_count: DefaultDict[str, int],
-    char_count: DefaultDict[str, int],
-    rules: Dict[str, str],
-) -> None:
-    """Polymerize virtually by counting pairs and single elements"""
-    for element, count in pair_count.copy().items():
-        # Count the newly inserted character
-        insertion = rules[element]
-        char_count[insertion] += count
-
-        # Update the counter for pairs (remove existing, add newly generated ones)
-        pair_count[element] -= count
-        pair_count[element[0] + insertion] += count
-        pair_count[insertion + element[1]] += count
+from typing import DefaultDict, Dict, List, Optional
+
+# Sparse matrix: one dictionary per row, mapping column indices to non-zero entries
+SparseMatrix = List[Dict[int, int]]
+
+
+def multiply(
+    a: SparseMatrix, b: SparseMatrix, modulus: Optional[int] = None
+) -> SparseMatrix:
+    """Multiply the two sparse matrices `a` and `b` (optionally modulo `modulus`)"""
+    product: SparseMatrix = []
+    for row in a:
+        result: DefaultDict[int, int] = defaultdict(int)
+        for k, a_entry in row.items():
+            for j, b_entry in b[k].items():
+                result[j] += a_entry * b_entry
+        if modulus is not None:
+            product.append({j: entry % modulus for j, entry in result.items()})
+        else:
+            product.append(dict(result))
+    return product
+
+
+class PairPolymerizer:
+    def __init__(self, rules: Dict[str, str]) -> None:
+        """Model a polymerization step as a linear map on the counts of pairs"""
+        self.pairs: List[str] = []
+        self.index: Dict[str, int] = {}
+
+        # Entry [i][j] is the number of pairs `j` a single pair `i` turns into
+        self.step_matrix: SparseMatrix = []
+
+        for pair, insertion in rules.items():
+            for p in [pair, pair[0] + insertion, insertion + pair[1]]:
+                self._add_pair(p)
+
+        for pair, insertion in rules.items():
+            row: DefaultDict[int, int] = defaultdict(int)
+            row[self.index[pair[0] + insertion]] += 1
+            row[self.index[insertion + pair[1]]] += 1
+            self.step_matrix[self.index[pair]] = dict(row)
+
+    def _add_pair(self, pair: str) -> int:
+        if pair not in self.index:
+            # Pairs without a rule stay as they are
+            self.index[pair] = len(self.pairs)
+            self.pairs.append(pair)
+            self.step_matrix.append({self.index[pair]: 1})
+        return self.index[pair]
+
+    def count_pairs(self, template: str) -> Dict[int, int]:
+        """Count the known pairs of the `template` (by index)"""
+        pair_count: DefaultDict[int, int] = defaultdict(int)
+        for i in range(len(template) - 1):
+            pair = template[i : i + 2]
+            if pair in self.index:
+                pair_count[self.index[pair]] += 1
+        return dict(pair_count)
+
+    def step(
+        self, pair_count: Dict[int, int], modulus: Optional[int] = None
+    ) -> Dict[int, int]:
+        """Apply a single polymerization step to the pair counts"""
+        return multiply([pair_count], self.step_matrix, modulus)[0]
+
+    def count_elements(
+        self, template: str, steps: int, modulus: Optional[int] = None
+    ) -> Dict[str, int]:
+        """Count the elements of the polymer after the given number of `steps`"""
+        assert len(template) > 0 and steps >= 0
+        pair_count = self.count_pairs(template)
+
+        if modulus is None:
+            # Exact counts grow with every step, so squaring the step matrix would
+            # only produce huge numbers; apply the steps one after another instead
+            for _ in range(steps):
+                pair_count = self.step(pair_count)
+        else:
+            # Exponentiation by squaring, applying the powers of the step matrix to
+            # the pair counts (as row vector)
+            power = self.step_matrix
+            while steps > 0:
+                if steps & 1:
+                    pair_count = multiply([pair_count], power, modulus)[0]
+                steps >>= 1
+                if steps > 0:
+                    power = multiply(power, power, modulus)
+
+        # Every element is the first one of a pair, except for the very last one
+        char_count: DefaultDict[str, int] = defaultdict(int)
+        for i in range(len(template) - 1):
+            # Pairs without a rule never change
+            if template[i : i + 2] not in self.index:
+                char_count[template[i]] += 1
+        for i, count in pair_count.items():
+            char_count[self.pairs[i][0]] += count
+        char_count[template[-1]] += 1
+
+        if modulus is not None:
+            return {element: count % modulus for element, count in char_count.items()}
+        return dict(char_count)
 
 
 def main():
@@ -64,18 +118,14 @@ def main():
 
     start = timer()
 
-    # Part 1: Generate the actual polymer
-    polymer = polymer_template
-    for _ in range(10):
-        polymer = polymerize(polymer, insertion_rules)
-    small_count = {c: polymer.count(c) for c in set(polymer)}
+    # Perform the polymerization "virtually" by counting pairs (for both parts)
+    polymerizer = PairPolymerizer(insertion_rules)
+
+    small_count = polymerizer.count_elements(polymer_template, 10)
     small_polymer_result = max(small_count.values()) - min(small_count.values())
 
-    # Part 2: Perform the polymerization "virtually" by counting the characters
-    pair_count, char_count = count_pairs_and_characters(polymer_template)
-    for _ in range(40):
-        polymerize_virtually(pair_count, char_count, insertion_rules)
-    big_polymer_result = max(char_count.values()) - min(char_count.values())
+    big_count = polymerizer.count_elements(polymer_template, 40)
+    big_polymer_result = max(big_count.values()) - min(big_count.values())
 
     stop = timer()
 
@@ -1,9 +1,8 @@
-from argparse import ArgumentParser
+from argparse import ArgumentParser, Namespace
 from pathlib import Path
 
 
-def get_input_path(message: str) -> Path:
-    parser = ArgumentParser(description=message)
+def get_input_args(parser: ArgumentParser) -> Namespace:
     parser.add_argument("input_path", type=Path, help="Path to the input file")
     args = parser.parse_args()
     path: Path = args.input_path
@@ -11,6 +10,11 @@ def get_input_path(message: str) -> Path:
     if not path.exists() or not path.is_file():
         parser.error("Input path must be a valid file")
 
+    return args
+
+
+def get_input_path(message: str) -> Path:
+    path: Path = get_input_args(ArgumentParser(description=message)).input_path
     return path
 
 